@@ -1,102 +1,229 @@
 import os
+from functools import lru_cache
+from io import StringIO, TextIOWrapper
 from typing import List, Tuple
 import numpy as np
 import pandas as pd
 
-from models import L0Record, L1Record
+from models import L0Batch, L1Batch
 from scodes import SCodeConfig
 
+try:
+    from pyarrow import csv as pacsv  # optional; much faster on wide tables
+except Exception:
+    pacsv = None
 
-def _detect_pixel_columns(cols: List[str]) -> List[str]:
-    pix = [c for c in cols if c.lower().startswith("pixel_")]
-    if pix:
-        return pix
+# Read buffer for the line-oriented Blick readers: 4 MiB keeps the
+# number of read() syscalls in the single digits for typical L0 files.
+_L0_READ_BUFFER = 4 << 20
+
+
+def _detect_pixel_columns(cols: pd.Index) -> List[str]:
+    # single lowercase pass + vectorized string kernels instead of
+    # per-column Python string calls (there are thousands of columns)
+    low = cols.str.lower()
+    mask = low.str.startswith("pixel_")
+    if mask.any():
+        return cols[mask].tolist()
 
     # fallback: columns named p0,p1...
-    pix2 = [c for c in cols if c.lower().startswith("p") and c[1:].isdigit()]
-    return pix2
+    mask = low.str.match(r"^p\d+$")
+    return cols[mask].tolist()
+
 
+def _empty_batch(meta: dict) -> L0Batch:
+    return L0Batch(
+        spectrum=np.empty((0, 0), dtype=np.float32),
+        dark=None,
+        timestamps=np.empty(0, dtype=object),
+        integration_time_ms=np.empty(0, dtype=np.float64),
+        temperature_c=np.empty(0, dtype=np.float64),
+        metadata=meta
+    )
+
+
+def read_l0_pixel_csv(path: str) -> L0Batch:
+    """
+    Reads column-oriented L0 CSV files: one row per record with
+    'timestamp', 'integration_time_ms', optional 'temperature_c',
+    pixel_0..pixel_N (or p0..pN) spectrum columns and optional
+    dark_0..dark_N columns.
 
-def read_l0_csv(path: str) -> List[L0Record]:
+    The pixel and dark blocks are extracted once as contiguous 2-D
+    float32 arrays; no per-cell access. Uses the pyarrow CSV reader
+    when available (pandas' C engine degrades on very wide tables),
+    falling back to pandas otherwise.
+    """
+    if pacsv is not None:
+        df = pacsv.read_csv(path).to_pandas()
+    else:
+        df = pd.read_csv(path, engine='c')
+    meta = {"source_file": os.path.basename(path)}
+
+    pixel_cols = _detect_pixel_columns(df.columns)
+    if not pixel_cols:
+        return _empty_batch(meta)
+    dark_cols = [c for c in df.columns if c.lower().startswith("dark_")]
+
+    n = len(df)
+    tc = (df['temperature_c'].to_numpy(dtype=np.float64)
+          if 'temperature_c' in df.columns else np.full(n, np.nan))
+
+    return L0Batch(
+        spectrum=df[pixel_cols].to_numpy(dtype=np.float32),
+        dark=df[dark_cols].to_numpy(dtype=np.float32) if dark_cols else None,
+        timestamps=df['timestamp'].astype(str).to_numpy(),
+        integration_time_ms=df['integration_time_ms'].to_numpy(dtype=np.float64),
+        temperature_c=tc,
+        metadata=meta
+    )
+
+
+# Blick MO line layout (whitespace-delimited):
+#   column 0      record type ("MO")
+#   column 1      timestamp (ISO 8601)
+#   columns 2+    numeric metadata fields; integration time is the 5th
+#                 numeric field (column 6), spectrum starts at column 13
+_MO_TS_COL = 1
+_MO_IT_COL = 6
+_MO_SPEC_COL = 13
+
+
+def _mo_line_numeric(line: str) -> bool:
+    """True when every field after the timestamp parses as a number."""
+    try:
+        np.array(line.split()[_MO_TS_COL + 1:], dtype=np.float64)
+        return True
+    except ValueError:
+        return False
+
+
+def _parse_mo_lines(mo_lines: List[str], meta: dict) -> List[L0Batch]:
+    """
+    Parse a chunk of 'MO ' lines into L0Batches via pandas' C parser.
+
+    A single file can mix record widths (e.g. full- and half-resolution
+    spectra), which the C parser cannot ingest as one table. Each width
+    group is parsed as one numeric block, then re-sliced into runs of
+    consecutive equal-width records so the batches come back in file
+    order with no record dropped. Truncated records with no spectrum
+    data and malformed lines holding a non-numeric token (e.g. Blick
+    comment records) are skipped.
+    """
+    widths = [len(l.split()) for l in mo_lines]
+    keep = [(i, w) for i, w in enumerate(widths) if w >= _MO_SPEC_COL + 1]
+    if not keep:
+        return []
+
+    # One C-parser pass per width group. Numeric columns go straight
+    # into float32 so no float64 intermediate block is materialized;
+    # the record-type and timestamp columns stay strings.
+    groups = {}
+    for width in sorted({w for _, w in keep}):
+        dtypes = {i: np.float32 for i in range(width)}
+        dtypes[0] = str
+        dtypes[_MO_TS_COL] = str
+
+        try:
+            df = pd.read_csv(
+                StringIO("".join(mo_lines[i] for i, w in keep if w == width)),
+                sep=r'\s+',
+                header=None,
+                engine='c',
+                na_filter=False,
+                dtype=dtypes
+            )
+        except ValueError:
+            # A single malformed line (a comment or corrupt record with
+            # a non-numeric token) poisons its whole width group; screen
+            # the lines token-by-token and reparse the survivors so one
+            # bad line is skipped rather than fatal.
+            good = [l for l in mo_lines if _mo_line_numeric(l)]
+            if len(good) == len(mo_lines):
+                raise
+            return _parse_mo_lines(good, meta)
+        groups[width] = (
+            np.ascontiguousarray(
+                df.iloc[:, _MO_SPEC_COL:].to_numpy(dtype=np.float32)),
+            df.iloc[:, _MO_TS_COL].to_numpy(),
+            df.iloc[:, _MO_IT_COL].to_numpy(dtype=np.float64),
+        )
+
+    # Slice each group back into file-order runs; slices are views of
+    # the contiguous group arrays, so no rows are copied.
+    batches: List[L0Batch] = []
+    offsets = {w: 0 for w in groups}
+    run_start = 0
+    for k in range(1, len(keep) + 1):
+        if k < len(keep) and keep[k][1] == keep[run_start][1]:
+            continue
+        width = keep[run_start][1]
+        n = k - run_start
+        start = offsets[width]
+        spectrum, timestamps, integration_time = groups[width]
+        batches.append(L0Batch(
+            spectrum=spectrum[start:start + n],
+            dark=None,
+            timestamps=timestamps[start:start + n],
+            integration_time_ms=integration_time[start:start + n],
+            temperature_c=np.full(n, np.nan),
+            metadata=meta
+        ))
+        offsets[width] = start + n
+        run_start = k
+    return batches
+
+
+def read_l0_csv(path: str) -> List[L0Batch]:
     """
     Reads Blick L0 format files with space-delimited measurement records.
     Blick format: Each data record starts with a record type (e.g., MO for measurement)
     followed by timestamp, integration time, and spectra data.
+
+    Measurement lines are collected and handed to pandas' C parser in
+    width-grouped blocks instead of being split and float()-ed field by
+    field in Python. Returns the L0Batches in file order, one per run of
+    consecutive equal-width records; for files too large to hold in
+    memory use read_l0_csv_batches().
     """
     # Try to read with UTF-8, fallback to latin-1 if encoding issues occur
     try:
-        with open(path, 'r', encoding='utf-8') as f:
+        with open(path, 'r', encoding='utf-8', buffering=_L0_READ_BUFFER) as f:
             all_lines = f.readlines()
     except UnicodeDecodeError:
-        with open(path, 'r', encoding='latin-1') as f:
+        with open(path, 'r', encoding='latin-1', buffering=_L0_READ_BUFFER) as f:
             all_lines = f.readlines()
-    
-    recs: List[L0Record] = []
-    
-    # Process lines looking for measurement records (starting with "MO" for Measurement]
-    for line in all_lines:
-        line = line.strip()
-        if not line:
-            continue
-        
-        # Check if this is a measurement record (starts with MO)
-        if line.startswith('MO '):
-            try:
-                parts = line.split()
-                if len(parts) < 3:
-                    continue
-                
-                # Parse the record:
-                # parts[0] = Record type ("MO")
-                # parts[1] = Timestamp (ISO 8601 format)
-                # parts[2] onwards = numerical data
-                
-                timestamp = parts[1]
-                
-                # The third field is typically routine count
-                # Fourth field is repetition count  
-                # Fifth field onwards contains spectrum data
-                # Integration time is typically in one of the early numeric fields
-                # For now, use a placeholder value from the numeric fields
-                
-                numeric_fields = []
-                for p in parts[2:]:
-                    try:
-                        numeric_fields.append(float(p))
-                    except ValueError:
-                        break
-                
-                if len(numeric_fields) < 10:
-                    continue
-                
-                # Extract integration time (usually 5th numeric field = index 4)
-                integration_time_ms = numeric_fields[4]
-                
-                # Spectrum data starts after the metadata fields
-                # Based on Blick format: 4120 numeric fields total, spectrum is 4109 elements
-                # Metadata: 11 fields (indices 0-10), Spectrum starts at index 11
-                spectrum_data = numeric_fields[11:]
-                
-                if len(spectrum_data) == 0:
-                    continue
-                
-                spec = np.array(spectrum_data, dtype=float)
-                
-                recs.append(
-                    L0Record(
-                        timestamp=timestamp,
-                        integration_time_ms=float(integration_time_ms),
-                        spectrum_counts=spec,
-                        dark_counts=None,
-                        temperature_c=None,
-                        metadata={"source_file": os.path.basename(path)}
-                    )
-                )
-            except (ValueError, IndexError):
-                # Skip malformed lines
+
+    meta = {"source_file": os.path.basename(path)}
+    return _parse_mo_lines([l for l in all_lines if l.startswith('MO ')], meta)
+
+
+def read_l0_csv_batches(path: str, batch_size: int = 1024):
+    """
+    Streaming variant of read_l0_csv: yields L0Batch chunks of up to
+    batch_size records so memory stays O(batch) instead of O(file); as
+    in read_l0_csv, a mixed-width chunk yields one batch per run of
+    equal-width records. The file is read in binary through a 4 MiB
+    buffer and each measurement line is decoded on its own (UTF-8 with
+    latin-1 fallback): a whole-file retry after a decode error would
+    re-yield every batch already emitted by this generator.
+    """
+    meta = {"source_file": os.path.basename(path)}
+    with open(path, 'rb', buffering=_L0_READ_BUFFER) as f:
+        pending: List[str] = []
+        for raw in f:
+            if not raw.startswith(b'MO '):
                 continue
-    
-    return recs
+            try:
+                line = raw.decode('utf-8')
+            except UnicodeDecodeError:
+                line = raw.decode('latin-1')
+            pending.append(line)
+            if len(pending) >= batch_size:
+                yield from _parse_mo_lines(pending, meta)
+                pending = []
+        if pending:
+            yield from _parse_mo_lines(pending, meta)
 
 
 def build_l1_filename(
@@ -111,6 +238,20 @@ def build_l1_filename(
     return f"{base}_L1_s{scode.code}c{cal_version}d{cal_date}p{proc_version}.txt"
 
 
+@lru_cache(maxsize=8)
+def _waves_str(waves_bytes: bytes) -> str:
+    """Formatted nominal-wavelength header line, cached across files in a batch."""
+    waves = np.frombuffer(waves_bytes, dtype=np.float64)
+    return ", ".join([f"{w:.2f}" for w in waves])
+
+
+@lru_cache(maxsize=8)
+def _column_header(n_pix: int) -> str:
+    spec = ",".join([f"spec_{i}" for i in range(n_pix)])
+    unc = ",".join([f"unc_{i}" for i in range(n_pix)])
+    return f"# timestamp,integration_time_ms,processing_flag,dqf,{spec},{unc}\n"
+
+
 def _fmt_generation_date_utc(date_str: str) -> str:
     """Format generation date for header."""
     # Convert YYYYMMDD format to readable date
@@ -121,7 +262,7 @@ def _fmt_generation_date_utc(date_str: str) -> str:
 
 def write_l1_text(
     out_path: str,
-    l1_records: List[L1Record],
+    l1,  # L1Batch, or list of L1Batch for mixed-resolution files
     scode: SCodeConfig,
     cal_version: str,
     cal_date: str,
@@ -134,10 +275,15 @@ def write_l1_text(
     proc_version: str = "1-0",
     generation_date_utc: str = ""
 ) -> None:
-    if not l1_records:
+    batches = [l1] if isinstance(l1, L1Batch) else list(l1)
+    batches = [b for b in batches if len(b)]
+    if not batches:
         raise ValueError("No L1 records to write.")
 
-    n_pix = len(l1_records[0].spectrum)
+    # Header geometry (column names, nominal wavelengths) follows the
+    # first batch; later batches of a mixed-resolution file contribute
+    # shorter/longer data rows, as the per-record writer did.
+    n_pix = batches[0].n_pixels
 
     # Use current date if not provided
     if not generation_date_utc:
@@ -147,13 +293,15 @@ def write_l1_text(
     # Extract output filename
     output_filename = os.path.basename(out_path)
 
-    # Format wavelengths
+    # Format wavelengths (cached: identical across files in a batch)
     if wavelengths is None:
         wavelengths = np.linspace(280, 530, n_pix)
-    
-    waves_str = ", ".join([f"{w:.2f}" for w in wavelengths])
 
-    with open(out_path, "w", encoding="utf-8") as f:
+    waves_str = _waves_str(np.ascontiguousarray(wavelengths, dtype=np.float64).tobytes())
+
+    # Binary mode with a 1 MiB buffer: one encoded write for the whole
+    # header, no text-mode translation layer on the bulk data.
+    with open(out_path, "wb", buffering=1 << 20) as f:
         # Build header lines
         lines = [
             f"File name: {output_filename}",
@@ -182,27 +330,29 @@ def write_l1_text(
             "",
         ]
 
-        # Write header
-        for line in lines:
-            f.write(f"{line}\n")
-
-        # Write column definitions
-        f.write("# columns:\n")
-        f.write("# timestamp,integration_time_ms,processing_flag,dqf,")
-        f.write(",".join([f"spec_{i}" for i in range(n_pix)]))
-        f.write(",")
-        f.write(",".join([f"unc_{i}" for i in range(n_pix)]))
-        f.write("\n")
-
-        for r in l1_records:
-            left = [
-                r.timestamp,
-                f"{r.integration_time_ms:.6f}",
-                str(r.processing_flag),
-                str(r.dqf),
-            ]
-            spec = [f"{v:.8e}" for v in r.spectrum]
-            unc = [f"{u:.8e}" for u in r.uncertainty]
-            f.write(",".join(left + spec + unc) + "\n")
+        # Write header + column definitions (cached per pixel count) in
+        # one encoded chunk
+        header = "\n".join(lines) + "\n# columns:\n" + _column_header(n_pix)
+        f.write(header.encode("utf-8"))
+
+        # Format the data block in one to_csv call per batch instead of
+        # 2*P f-strings per record. Integration time keeps its fixed
+        # '%.6f' format by pre-formatting that column; the float block
+        # (spectra + uncertainties) gets float_format='%.8e', with
+        # non-finite values spelled 'nan' as the f-string writer did.
+        tw = TextIOWrapper(f, encoding="utf-8", newline="")
+        try:
+            for batch in batches:
+                df = pd.DataFrame(np.hstack([batch.spectrum, batch.uncertainty]))
+                df.insert(0, "dqf", batch.dqf)
+                df.insert(0, "processing_flag", batch.processing_flag)
+                df.insert(0, "integration_time_ms",
+                          np.char.mod("%.6f", batch.integration_time_ms))
+                df.insert(0, "timestamp", batch.timestamps)
+                df.to_csv(tw, float_format="%.8e", na_rep="nan",
+                          header=False, index=False, lineterminator="\n")
+        finally:
+            tw.flush()
+            tw.detach()
 
 
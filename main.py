@@ -1,19 +1,20 @@
 import os
 import sys
 import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from typing import List
 
-from PyQt5.QtCore import Qt
+from PyQt5.QtCore import Qt, QObject, QThread, pyqtSignal
 from PyQt5.QtWidgets import (
     QApplication, QWidget, QLabel, QPushButton, QFileDialog, QVBoxLayout,
     QHBoxLayout, QProgressBar, QTextEdit, QMessageBox, QComboBox, QLineEdit,
     QCheckBox, QGroupBox, QFormLayout
 )
 
-from scodes import get_scode_configs
+from scodes import get_scode, get_scode_configs
 from io_utils import read_l0_csv, write_l1_text, build_l1_filename
 from corrections import CalibrationData
-from processor import process_l0_to_l1
+from processor import ProcessStats, process_l0_to_l1
 from gpu_backend import get_backend
 
 
@@ -21,6 +22,150 @@ APP_NAME = "SciGlob Processor"
 APP_VERSION = "1.0.0"
 
 
+def _extract_instrument_numbers(l0_basename: str) -> (str, str):
+    """Extract instrument/spectrometer numbers from an L0 filename
+    like 'Pandora209s1_Izana_...'."""
+    instrument_num = "209"
+    spectrometer_num = "s1"
+    if "Pandora" in l0_basename:
+        parts = l0_basename.split("_")
+        if parts:
+            prefix = parts[0]  # e.g., "Pandora209s1"
+            if prefix.startswith("Pandora"):
+                after_pandora = prefix[7:]  # Remove "Pandora"
+                for i, c in enumerate(after_pandora):
+                    if c.isalpha():
+                        instrument_num = after_pandora[:i]
+                        spectrometer_num = after_pandora[i:]
+                        break
+    return instrument_num, spectrometer_num
+
+
+def _process_one(path, output_dir, scode, cal_ver, cal_date, use_gpu=False):
+    """
+    Read, process and write a single L0 file. Module-level so it can run
+    in a ProcessPoolExecutor worker. Returns (out_path, stats); out_path
+    is None when the file held no measurement records.
+    """
+    l0_batches = read_l0_csv(path)
+    if not l0_batches:
+        return None, None
+
+    backend = get_backend(use_gpu)
+
+    # A file can mix spectral resolutions; each pixel count gets its own
+    # calibration and every batch lands in the same L1 file, in order.
+    cals = {}
+    l1_batches = []
+    stats = ProcessStats()
+    for l0 in l0_batches:
+        cal = cals.get(l0.n_pixels)
+        if cal is None:
+            cal = cals[l0.n_pixels] = CalibrationData(n_pixels=l0.n_pixels)
+        l1, batch_stats = process_l0_to_l1(l0, scode, cal, backend=backend)
+        stats.merge(batch_stats)
+        l1_batches.append(l1)
+
+    out_name = build_l1_filename(
+        l0_path=path,
+        scode=scode,
+        cal_version=cal_ver,
+        cal_date=cal_date,
+        proc_version="1-0"
+    )
+    out_path = os.path.join(output_dir, out_name)
+
+    l0_basename = os.path.basename(path)
+    instrument_num, spectrometer_num = _extract_instrument_numbers(l0_basename)
+
+    write_l1_text(
+        out_path=out_path,
+        l1=l1_batches,
+        scode=scode,
+        cal_version=cal_ver,
+        cal_date=cal_date,
+        l0_filename=l0_basename,
+        instrument_number=instrument_num,
+        spectrometer_number=spectrometer_num,
+        wavelengths=cals[l0_batches[0].n_pixels].wavelength_nm,
+        software_name=APP_NAME,
+        software_version=APP_VERSION,
+        proc_version="1-0"
+    )
+    return out_path, stats
+
+
+class ProcessorWorker(QObject):
+    """
+    Runs the L0 -> L1 pipeline off the GUI thread so reading, processing
+    and writing do not freeze the event loop between files. Files are
+    independent of each other, so they are fanned out across cores with
+    a ProcessPoolExecutor; the GPU backend forces sequential processing
+    (one CUDA context).
+    """
+    progress = pyqtSignal(int)
+    log = pyqtSignal(str)
+    done = pyqtSignal(int, int)   # files completed, files total
+
+    def __init__(self, l0_files, output_dir, scode, cal_ver, cal_date, use_gpu):
+        super().__init__()
+        self.l0_files = list(l0_files)
+        self.output_dir = output_dir
+        self.scode = scode
+        self.cal_ver = cal_ver
+        self.cal_date = cal_date
+        self.use_gpu = use_gpu
+
+    def _report(self, path, out_path, stats, n_finished, total):
+        if out_path is None:
+            self.log.emit(f"[WARN] {os.path.basename(path)}: no records found, skipped.")
+        else:
+            self.log.emit(
+                f"[OK] Wrote: {out_path}\n"
+                f"      Records={stats.total}, DQ0={stats.good}, DQ1={stats.medium}, DQ2={stats.low}"
+            )
+        self.progress.emit(int(n_finished * 100 / total))
+
+    def run(self):
+        backend = get_backend(self.use_gpu)
+        self.log.emit(f"[INFO] Backend selected: {backend.name}")
+
+        total = len(self.l0_files)
+        done = 0
+        args = (self.output_dir, self.scode, self.cal_ver, self.cal_date)
+
+        if self.use_gpu or total == 1:
+            for idx, path in enumerate(self.l0_files, start=1):
+                self.log.emit(f"\n[INFO] Processing file: {os.path.basename(path)}")
+                try:
+                    out_path, stats = _process_one(path, *args, use_gpu=self.use_gpu)
+                except Exception as e:
+                    self.log.emit(f"[ERROR] {os.path.basename(path)} failed.")
+                    self.log.emit(str(e))
+                    self.log.emit(traceback.format_exc())
+                else:
+                    if out_path is not None:
+                        done += 1
+                    self._report(path, out_path, stats, idx, total)
+        else:
+            with ProcessPoolExecutor(max_workers=os.cpu_count()) as ex:
+                futures = {ex.submit(_process_one, p, *args): p for p in self.l0_files}
+                for n_finished, fut in enumerate(as_completed(futures), start=1):
+                    path = futures[fut]
+                    try:
+                        out_path, stats = fut.result()
+                    except Exception as e:
+                        self.log.emit(f"[ERROR] {os.path.basename(path)} failed.")
+                        self.log.emit(str(e))
+                        self.progress.emit(int(n_finished * 100 / total))
+                    else:
+                        if out_path is not None:
+                            done += 1
+                        self._report(path, out_path, stats, n_finished, total)
+
+        self.done.emit(done, total)
+
+
 class SciGlobProcessorGUI(QWidget):
     def __init__(self):
         super().__init__()
@@ -149,8 +294,8 @@ class SciGlobProcessorGUI(QWidget):
 
         text = (
             f"{sc.description}\n"
-            f"dark_unc_source={sc.dark_unc_source}, "
-            f"straylight={sc.straylight_mode}, "
+            f"dark_unc_source={sc.dark_unc_source.name}, "
+            f"straylight={sc.straylight_mode.name}, "
             f"sensitivity={'YES' if sc.sensitivity else 'NO'}, "
             f"wavelength={'YES' if sc.wavelength else 'NO'}"
         )
@@ -181,94 +326,38 @@ class SciGlobProcessorGUI(QWidget):
             return
 
         code = self.cmb_scode.currentText().strip()
-        scode = self.scodes[code]
+        scode = get_scode(code)
         cal_ver = self.in_cal_ver.text().strip()
         cal_date = self.in_cal_date.text().strip()
 
-        backend = get_backend(self.chk_gpu.isChecked())
-        self.append_log(f"[INFO] Backend selected: {backend.name}")
-
-        total = len(self.l0_files)
-        done = 0
-
         self.progress.setValue(0)
         self.btn_run.setEnabled(False)
 
-        try:
-            for idx, path in enumerate(self.l0_files, start=1):
-                self.append_log(f"\n[INFO] Processing file: {os.path.basename(path)}")
-                l0 = read_l0_csv(path)
-                if len(l0) == 0:
-                    self.append_log("[WARN] No records found, skipping.")
-                    continue
-
-                n_pix = len(l0[0].spectrum_counts)
-                cal = CalibrationData(n_pixels=n_pix)
-
-                # Process
-                l1_records, stats = process_l0_to_l1(l0, scode, cal)
-
-                # Write
-                out_name = build_l1_filename(
-                    l0_path=path,
-                    scode=scode,
-                    cal_version=cal_ver,
-                    cal_date=cal_date,
-                    proc_version="1-0"
-                )
-                out_path = os.path.join(self.output_dir, out_name)
-
-                # Extract instrument and spectrometer numbers from L0 filename
-                l0_basename = os.path.basename(path)
-                # Expected format: Pandora209s1_Izana_*
-                instrument_num = "209"
-                spectrometer_num = "s1"
-                if "Pandora" in l0_basename:
-                    parts = l0_basename.split("_")
-                    if parts:
-                        prefix = parts[0]  # e.g., "Pandora209s1"
-                        if prefix.startswith("Pandora"):
-                            after_pandora = prefix[7:]  # Remove "Pandora"
-                            for i, c in enumerate(after_pandora):
-                                if c.isalpha():
-                                    instrument_num = after_pandora[:i]
-                                    spectrometer_num = after_pandora[i:]
-                                    break
-
-                write_l1_text(
-                    out_path=out_path,
-                    l1_records=l1_records,
-                    scode=scode,
-                    cal_version=cal_ver,
-                    cal_date=cal_date,
-                    l0_filename=l0_basename,
-                    instrument_number=instrument_num,
-                    spectrometer_number=spectrometer_num,
-                    wavelengths=cal.wavelength_nm,
-                    software_name=APP_NAME,
-                    software_version=APP_VERSION,
-                    proc_version="1-0"
-                )
-
-                self.append_log(
-                    f"[OK] Wrote: {out_path}\n"
-                    f"      Records={stats.total}, DQ0={stats.good}, DQ1={stats.medium}, DQ2={stats.low}"
-                )
-
-                done += 1
-                self.progress.setValue(int(idx * 100 / total))
-                QApplication.processEvents()
-
-            QMessageBox.information(self, "Done", f"Completed {done}/{total} file(s).")
-            self.append_log(f"\n[DONE] Completed {done}/{total} file(s).")
-
-        except Exception as e:
-            self.append_log("[ERROR] Processing failed.")
-            self.append_log(str(e))
-            self.append_log(traceback.format_exc())
-            QMessageBox.critical(self, "Error", f"Processing failed:\n{e}")
-        finally:
-            self.btn_run.setEnabled(True)
+        self._worker = ProcessorWorker(
+            l0_files=self.l0_files,
+            output_dir=self.output_dir,
+            scode=scode,
+            cal_ver=cal_ver,
+            cal_date=cal_date,
+            use_gpu=self.chk_gpu.isChecked()
+        )
+        self._thread = QThread(self)
+        self._worker.moveToThread(self._thread)
+
+        self._thread.started.connect(self._worker.run)
+        self._worker.log.connect(self.append_log)
+        self._worker.progress.connect(self.progress.setValue)
+        self._worker.done.connect(self._on_conversion_done)
+        self._worker.done.connect(self._thread.quit)
+        self._thread.finished.connect(self._worker.deleteLater)
+        self._thread.finished.connect(self._thread.deleteLater)
+
+        self._thread.start()
+
+    def _on_conversion_done(self, done: int, total: int):
+        self.btn_run.setEnabled(True)
+        self.append_log(f"\n[DONE] Completed {done}/{total} file(s).")
+        QMessageBox.information(self, "Done", f"Completed {done}/{total} file(s).")
 
 
 if __name__ == "__main__":
@@ -1,5 +1,5 @@
 from dataclasses import dataclass, field
-from typing import Optional, Dict
+from typing import Dict, List, Optional
 import numpy as np
 
 
@@ -22,3 +22,78 @@ class L1Record:
     processing_flag: int
     dqf: int
     metadata: Dict = field(default_factory=dict)
+
+
+@dataclass
+class L0Batch:
+    """
+    Structure-of-arrays container for a whole L0 run: one contiguous
+    (N, P) spectrum block plus per-record scalar columns, instead of
+    N individual L0Record objects.
+    """
+    spectrum: np.ndarray                 # (N, P) raw counts
+    dark: Optional[np.ndarray]           # (N, P) dark counts, or None
+    timestamps: np.ndarray               # (N,) timestamp strings
+    integration_time_ms: np.ndarray      # (N,) float
+    temperature_c: np.ndarray            # (N,) float, NaN where unknown
+    metadata: Dict = field(default_factory=dict)
+
+    def __len__(self) -> int:
+        return self.spectrum.shape[0]
+
+    @property
+    def n_pixels(self) -> int:
+        return self.spectrum.shape[1]
+
+    def to_records(self) -> List[L0Record]:
+        """Compatibility shim: materialize per-record AoS objects (row views)."""
+        tc = self.temperature_c
+        return [
+            L0Record(
+                timestamp=self.timestamps[i],
+                integration_time_ms=float(self.integration_time_ms[i]),
+                spectrum_counts=self.spectrum[i],
+                dark_counts=None if self.dark is None else self.dark[i],
+                temperature_c=None if np.isnan(tc[i]) else float(tc[i]),
+                metadata=self.metadata
+            )
+            for i in range(len(self))
+        ]
+
+
+@dataclass
+class L1Batch:
+    """
+    Structure-of-arrays container for processed L1 output.
+    processing_flag is a single int: the applied corrections are fixed
+    by the s-code for the whole batch.
+    """
+    spectrum: np.ndarray                 # (N, P) corrected spectra
+    uncertainty: np.ndarray              # (N, P) matching uncertainties
+    timestamps: np.ndarray               # (N,) timestamp strings
+    integration_time_ms: np.ndarray      # (N,) float
+    processing_flag: int
+    dqf: np.ndarray                      # (N,) int
+    metadata: Dict = field(default_factory=dict)
+
+    def __len__(self) -> int:
+        return self.spectrum.shape[0]
+
+    @property
+    def n_pixels(self) -> int:
+        return self.spectrum.shape[1]
+
+    def to_records(self) -> List[L1Record]:
+        """Compatibility shim: materialize per-record AoS objects (row views)."""
+        return [
+            L1Record(
+                timestamp=self.timestamps[i],
+                integration_time_ms=float(self.integration_time_ms[i]),
+                spectrum=self.spectrum[i],
+                uncertainty=self.uncertainty[i],
+                processing_flag=self.processing_flag,
+                dqf=int(self.dqf[i]),
+                metadata=self.metadata
+            )
+            for i in range(len(self))
+        ]
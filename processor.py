@@ -1,18 +1,14 @@
 from dataclasses import dataclass
-from typing import List
+from functools import lru_cache
 import numpy as np
 
-from models import L0Record, L1Record
-from scodes import SCodeConfig
-from corrections import (
-    CalibrationData,
-    dark_correction,
-    prnu_correction,
-    temperature_correction,
-    sensitivity_correction,
-    to_count_rate,
-    uncertainty_model
-)
+from typing import Optional
+
+from models import L0Batch, L1Batch
+from scodes import SCodeConfig, SCodeFlags, StrayLightMode
+from corrections import CalibrationData, _LATENCY_K, _MM_K, _CORRMM_K
+from corrections_numba import apply_pointwise, finalize
+from gpu_backend import Backend
 
 # Bit mapping for processing_flag
 BIT_DARK = 0
@@ -33,115 +29,313 @@ class ProcessStats:
     medium: int = 0
     low: int = 0
 
+    def merge(self, other: "ProcessStats") -> None:
+        """Fold another batch's counts into this accumulator."""
+        self.total += other.total
+        self.good += other.good
+        self.medium += other.medium
+        self.low += other.low
+
 
-def _compute_dqf(spec: np.ndarray, unc: np.ndarray) -> int:
+def _compute_dqf(S: np.ndarray, U: np.ndarray) -> np.ndarray:
     """
-    Placeholder DQF:
+    Placeholder DQF per record for a whole (N, P) batch:
     0 = good, 1 = medium, 2 = low
     """
-    if np.any(~np.isfinite(spec)) or np.any(~np.isfinite(unc)):
-        return 2
-    if np.max(spec) <= 0:
-        return 2
+    finite_ok = np.isfinite(S).all(axis=1) & np.isfinite(U).all(axis=1)
+    max_ok = S.max(axis=1) > 0
 
-    snr = float(np.mean(spec) / (np.mean(unc) + 1e-12))
-    if snr < 5:
-        return 2
-    if snr < 15:
-        return 1
-    return 0
+    # accumulate in float64 even when spectra are float32
+    snr = (S.mean(axis=1, dtype=np.float64)
+           / (U.mean(axis=1, dtype=np.float64) + 1e-12))
 
+    return np.where(~finite_ok | ~max_ok | (snr < 5), 2,
+                    np.where(snr < 15, 1, 0))
 
-def process_l0_to_l1(
-    records: List[L0Record],
-    scode: SCodeConfig,
+
+def _correct_on_gpu(batch: L0Batch, scode: SCodeConfig, cal: CalibrationData, xp):
+    """
+    Run the correction chain on the GPU via CuPy. Mirrors the CPU path
+    below: element-wise ops over the (N, P) block plus 1-D convolutions.
+    Returns (S, pflag) with S still resident on the device.
+    """
+    from cupyx.scipy.ndimage import convolve1d
+
+    S = xp.asarray(batch.spectrum, dtype=xp.float32)
+    pflag = 0
+
+    if scode.dark:
+        if batch.dark is not None:
+            S -= xp.asarray(batch.dark, dtype=xp.float32)
+        pflag |= (1 << BIT_DARK)
+
+    if scode.nonlinearity:
+        S -= 1e-6 * S * S
+        pflag |= (1 << BIT_NONLINEARITY)
+
+    if scode.latency:
+        S = convolve1d(S, xp.asarray(_LATENCY_K), axis=-1, mode="nearest")
+        pflag |= (1 << BIT_LATENCY)
+
+    if scode.prnu:
+        S *= xp.asarray(cal.prnu_inv)[None, :]
+        pflag |= (1 << BIT_PRNU)
+
+    if scode.temperature:
+        T = np.where(np.isnan(batch.temperature_c), cal.ref_temp_c,
+                     batch.temperature_c)
+        dt = xp.asarray((T - cal.ref_temp_c).astype(np.float32))
+        f = 1.0 + xp.asarray(cal.temp_coeff)[None, :] * dt[:, None]
+        S /= xp.where(f == 0.0, xp.float32(1.0), f)
+        pflag |= (1 << BIT_TEMPERATURE)
+
+    if scode.straylight_mode is StrayLightMode.MM:
+        S = convolve1d(S, xp.asarray(_MM_K), axis=-1, mode="nearest")
+        pflag |= (1 << BIT_STRAYLIGHT)
+    elif scode.straylight_mode is StrayLightMode.CORRMM:
+        S = convolve1d(S, xp.asarray(_CORRMM_K), axis=-1, mode="nearest")
+        pflag |= (1 << BIT_STRAYLIGHT)
+
+    if scode.sensitivity:
+        S *= xp.asarray(cal.sensitivity_inv)[None, :]
+        pflag |= (1 << BIT_SENSITIVITY)
+
+    if scode.wavelength:
+        S = cal.wavelength_correct(S)
+        pflag |= (1 << BIT_WAVELENGTH)
+
+    return S, pflag
+
+
+@dataclass
+class _PipelineCtx:
+    """Per-batch state threaded through the composed pipeline ops."""
     cal: CalibrationData
-) -> (List[L1Record], ProcessStats):
-    out: List[L1Record] = []
-    stats = ProcessStats(total=len(records))
+    dark: Optional[np.ndarray]
+    dt: np.ndarray                          # per-record temperature offset
+    conv_buf: Optional[np.ndarray] = None   # reusable convolution output
 
-    for rec in records:
-        spec = rec.spectrum_counts.astype(float).copy()
-        pflag = 0
+    def buf(self, S: np.ndarray) -> np.ndarray:
+        if self.conv_buf is None:
+            self.conv_buf = np.empty_like(S)
+        return self.conv_buf
 
-        # 1) Dark
-        if scode.dark:
-            spec = dark_correction(spec, rec.dark_counts)
-            pflag |= (1 << BIT_DARK)
 
-        # 2) Nonlinearity
-        if scode.nonlinearity:
-            spec = cal.nonlinearity_inverse(spec)
+@lru_cache(maxsize=None)
+def make_pipeline(flags: int):
+    """
+    Partial evaluation of the correction chain for one s-code, keyed on
+    its SCodeFlags bitmask: compose only the enabled steps into a list
+    of ops executed per batch, so no per-call branching on the config
+    remains. Returns (run, processing_flag, fuse_sensitivity); the
+    sensitivity/clip/count-rate tail is handled by finalize() at the
+    call site.
+    """
+    ops = []
+    pflag = 0
+
+    want_dark = bool(flags & SCodeFlags.DARK)
+    do_nonlinearity = bool(flags & SCodeFlags.NONLIN)
+    if want_dark or do_nonlinearity:
+        def dark_nonlin(S, ctx):
+            # 1) Dark + 2) Nonlinearity (fused pointwise pass)
+            do_dark = want_dark and ctx.dark is not None
+            D = ctx.dark if do_dark else S  # dummy, never read otherwise
+            apply_pointwise(S, D, ctx.cal.prnu_inv, ctx.cal.temp_coeff,
+                            ctx.cal.sensitivity_inv, ctx.dt,
+                            do_dark, do_nonlinearity, False, False, False)
+            return S
+        ops.append(dark_nonlin)
+        if want_dark:
+            pflag |= (1 << BIT_DARK)
+        if do_nonlinearity:
             pflag |= (1 << BIT_NONLINEARITY)
 
-        # 3) Latency
-        if scode.latency:
-            spec = cal.latency_correct(spec)
-            pflag |= (1 << BIT_LATENCY)
-
-        # 4) PRNU
-        if scode.prnu:
-            spec = prnu_correction(spec, cal)
-            pflag |= (1 << BIT_PRNU)
-
-        # 5) Temperature
-        if scode.temperature:
-            spec = temperature_correction(spec, rec.temperature_c, cal)
-            pflag |= (1 << BIT_TEMPERATURE)
-
-        # 6) Straylight
-        if scode.straylight_mode == "MM":
-            spec = cal.straylight_mm(spec)
-            pflag |= (1 << BIT_STRAYLIGHT)
-        elif scode.straylight_mode == "CORRMM":
-            spec = cal.straylight_corrmm(spec)
-            pflag |= (1 << BIT_STRAYLIGHT)
-
-        # 7) Sensitivity
-        if scode.sensitivity:
-            spec = sensitivity_correction(spec, cal)
-            pflag |= (1 << BIT_SENSITIVITY)
-
-        # 8) Wavelength
-        if scode.wavelength:
-            spec = cal.wavelength_correct(spec)
-            pflag |= (1 << BIT_WAVELENGTH)
-
-        spec = np.clip(spec, 0, None)
-
-        output_is_rate = False
-        if scode.count_rate:
-            spec_out = to_count_rate(spec, rec.integration_time_ms)
-            output_is_rate = True
+    if flags & SCodeFlags.LATENCY:
+        def latency(S, ctx):
+            # 3) Latency; ping-pong with the shared convolution buffer
+            res = ctx.cal.latency_correct(S, out=ctx.buf(S))
+            if res is not S:
+                ctx.conv_buf = S
+            return res
+        ops.append(latency)
+        pflag |= (1 << BIT_LATENCY)
+
+    if flags & SCodeFlags.PRNU:
+        def prnu(S, ctx):
+            # 4) PRNU
+            np.multiply(S, ctx.cal.prnu_inv[None, :], out=S)
+            return S
+        ops.append(prnu)
+        pflag |= (1 << BIT_PRNU)
+
+    if flags & SCodeFlags.TEMP:
+        def temperature(S, ctx):
+            # 5) Temperature: a run's temperatures cluster around a
+            # handful of values, so build the per-pixel factor once per
+            # unique temperature (quantized to 0.01 °C) and gather.
+            u_dt, inv = np.unique(np.round(ctx.dt, 2), return_inverse=True)
+            f = 1.0 + ctx.cal.temp_coeff[None, :] * u_dt[:, None]
+            factors = np.reciprocal(np.where(f == 0.0, np.float32(1.0), f))
+            np.multiply(S, factors[inv], out=S)
+            return S
+        ops.append(temperature)
+        pflag |= (1 << BIT_TEMPERATURE)
+
+    if flags & SCodeFlags.STRAY_MM:
+        def straylight(S, ctx):
+            # 6) Straylight (MM)
+            res = ctx.cal.straylight_mm(S, out=ctx.buf(S))
+            ctx.conv_buf = S
+            return res
+        ops.append(straylight)
+        pflag |= (1 << BIT_STRAYLIGHT)
+    elif flags & SCodeFlags.STRAY_CORRMM:
+        def straylight(S, ctx):
+            # 6) Straylight (CORRMM)
+            res = ctx.cal.straylight_corrmm(S, out=ctx.buf(S))
+            ctx.conv_buf = S
+            return res
+        ops.append(straylight)
+        pflag |= (1 << BIT_STRAYLIGHT)
+
+    # 7) Sensitivity + clip + count rate + uncertainty run fused in
+    # finalize(); sensitivity drops out of the fusion only when a
+    # wavelength correction has to happen between them.
+    fuse_sensitivity = bool(flags & SCodeFlags.SENS) and not (flags & SCodeFlags.WAVE)
+    if flags & SCodeFlags.SENS:
+        if not fuse_sensitivity:
+            def sensitivity(S, ctx):
+                np.multiply(S, ctx.cal.sensitivity_inv[None, :], out=S)
+                return S
+            ops.append(sensitivity)
+        pflag |= (1 << BIT_SENSITIVITY)
+
+    if flags & SCodeFlags.WAVE:
+        def wavelength(S, ctx):
+            # 8) Wavelength
+            return ctx.cal.wavelength_correct(S)
+        ops.append(wavelength)
+        pflag |= (1 << BIT_WAVELENGTH)
+
+    if flags & SCodeFlags.RATE:
+        pflag |= (1 << BIT_COUNT_RATE)
+
+    def run(S, ctx):
+        for op in ops:
+            S = op(S, ctx)
+        return S
+
+    return run, pflag, fuse_sensitivity
+
+
+def process_l0_to_l1(
+    batch: L0Batch,
+    scode: SCodeConfig,
+    cal: CalibrationData,
+    backend: Optional[Backend] = None
+) -> (L1Batch, ProcessStats):
+    n = len(batch)
+    stats = ProcessStats(total=n)
+    if n == 0:
+        return L1Batch(
+            spectrum=batch.spectrum.copy(),
+            uncertainty=batch.spectrum.copy(),
+            timestamps=batch.timestamps,
+            integration_time_ms=batch.integration_time_ms,
+            processing_flag=0,
+            dqf=np.empty(0, dtype=np.int64),
+            metadata=batch.metadata
+        ), stats
+
+    use_gpu = backend is not None and backend.name == "cupy"
+    if use_gpu:
+        # One transfer in, one transfer out; everything between runs on
+        # the device.
+        xp = backend.xp
+        S, pflag = _correct_on_gpu(batch, scode, cal, xp)
+        S = xp.clip(S, 0, None)
+
+        output_is_rate = bool(scode.count_rate)
+        if output_is_rate:
+            sec = xp.asarray(
+                (np.maximum(batch.integration_time_ms, 1e-9)[:, None] / 1000.0)
+                .astype(np.float32))
+            S_out = S / sec
             pflag |= (1 << BIT_COUNT_RATE)
         else:
-            spec_out = spec
-
-        unc = uncertainty_model(
-            corrected_counts=spec,
-            integration_time_ms=rec.integration_time_ms,
-            output_is_rate=output_is_rate,
-            floor_counts=1.5
-        )
-
-        dqf = _compute_dqf(spec_out, unc)
-        if dqf == 0:
-            stats.good += 1
-        elif dqf == 1:
-            stats.medium += 1
-        else:
-            stats.low += 1
-
-        out.append(
-            L1Record(
-                timestamp=rec.timestamp,
-                integration_time_ms=rec.integration_time_ms,
-                spectrum=spec_out,
-                uncertainty=unc,
-                processing_flag=pflag,
-                dqf=dqf,
-                metadata=rec.metadata
-            )
-        )
-
-    return out, stats
+            S_out = S
+
+        U = xp.sqrt(S + xp.float32(1.5 ** 2))
+        if output_is_rate:
+            U = U / sec
+
+        S_out = S_out.get()
+        U = U.get()
+        return _finalize_batch(batch, S_out, U, pflag, stats)
+
+    # CPU path: the s-code is fixed for a whole run, so the correction
+    # chain is composed once per s-code (make_pipeline, cached) and the
+    # per-batch call just executes the enabled steps.
+    run, pflag, fuse_sensitivity = make_pipeline(scode.flags)
+
+    S = batch.spectrum.astype(np.float32)
+    if scode.temperature:
+        T = np.where(np.isnan(batch.temperature_c), cal.ref_temp_c,
+                     batch.temperature_c)
+        dt = (T - cal.ref_temp_c).astype(np.float32)
+    else:
+        dt = np.zeros(n, dtype=np.float32)
+
+    ctx = _PipelineCtx(cal=cal, dark=batch.dark, dt=dt)
+    S = run(S, ctx)
+
+    output_is_rate = bool(scode.count_rate)
+    sec = (np.maximum(batch.integration_time_ms, 1e-9) / 1000.0).astype(np.float32)
+    S_out, U = finalize(S, cal.sensitivity_inv, sec,
+                        fuse_sensitivity, output_is_rate, np.float32(1.5))
+
+    return _finalize_batch(batch, S_out, U, pflag, stats)
+
+
+def process_l0_batches(
+    batches,
+    scode: SCodeConfig,
+    cal: CalibrationData,
+    backend: Optional[Backend] = None,
+    stats: Optional[ProcessStats] = None
+):
+    """
+    Streaming front end for process_l0_to_l1: consume an iterable of
+    L0Batch chunks (e.g. from io_utils.read_l0_csv_batches) and yield
+    one L1Batch per chunk, so only a batch is resident at a time. Pass
+    a ProcessStats to collect running counts across the whole stream.
+    """
+    for batch in batches:
+        l1, batch_stats = process_l0_to_l1(batch, scode, cal, backend)
+        if stats is not None:
+            stats.merge(batch_stats)
+        yield l1
+
+
+def _finalize_batch(
+    batch: L0Batch,
+    S_out: np.ndarray,
+    U: np.ndarray,
+    pflag: int,
+    stats: ProcessStats
+) -> (L1Batch, ProcessStats):
+    dqf = _compute_dqf(S_out, U)
+    stats.good = int(np.count_nonzero(dqf == 0))
+    stats.medium = int(np.count_nonzero(dqf == 1))
+    stats.low = int(np.count_nonzero(dqf == 2))
+
+    return L1Batch(
+        spectrum=S_out,
+        uncertainty=U,
+        timestamps=batch.timestamps,
+        integration_time_ms=batch.integration_time_ms,
+        processing_flag=pflag,
+        dqf=dqf,
+        metadata=batch.metadata
+    ), stats
@@ -1,85 +1,163 @@
+import sys
 from dataclasses import dataclass
-from typing import Dict
+from enum import IntEnum, IntFlag
+from functools import lru_cache
+from types import MappingProxyType
+from typing import Mapping
 
 
-@dataclass(frozen=True)
+class DarkUncSource(IntEnum):
+    """Where the dark uncertainty comes from."""
+    MEAS = 0
+    MAPSIGMA = 1
+
+
+class StrayLightMode(IntEnum):
+    """Which straylight correction model to run."""
+    NO = 0
+    MM = 1
+    CORRMM = 2
+
+
+class SCodeFlags(IntFlag):
+    """One bit per correction, so a whole s-code's enabled set is a
+    single integer usable as a pipeline cache key."""
+    DARK = 1
+    NONLIN = 2
+    LATENCY = 4
+    PRNU = 8
+    RATE = 16
+    TEMP = 32
+    STRAY_MM = 64
+    STRAY_CORRMM = 128
+    SENS = 256
+    WAVE = 512
+
+
+@dataclass(frozen=True, slots=True)
 class SCodeConfig:
     code: str
     description: str
     dark: bool
-    dark_unc_source: str   # "MEAS" / "MAPSIGMA"
+    dark_unc_source: DarkUncSource
     nonlinearity: bool
     latency: bool
     prnu: bool
     count_rate: bool
     temperature: bool
-    straylight_mode: str   # "NO" / "MM" / "CORRMM"
+    straylight_mode: StrayLightMode
     sensitivity: bool
     wavelength: bool
     qcode: str
     created: str
     author: str
+    flags: int = 0         # precomputed SCodeFlags mask, set in __post_init__
 
+    def __post_init__(self):
+        # qcode stays a string (it goes straight into headers); intern it
+        # so downstream equality checks collapse to pointer compares.
+        object.__setattr__(self, "qcode", sys.intern(self.qcode))
+        f = SCodeFlags(0)
+        if self.dark:
+            f |= SCodeFlags.DARK
+        if self.nonlinearity:
+            f |= SCodeFlags.NONLIN
+        if self.latency:
+            f |= SCodeFlags.LATENCY
+        if self.prnu:
+            f |= SCodeFlags.PRNU
+        if self.count_rate:
+            f |= SCodeFlags.RATE
+        if self.temperature:
+            f |= SCodeFlags.TEMP
+        if self.straylight_mode is StrayLightMode.MM:
+            f |= SCodeFlags.STRAY_MM
+        elif self.straylight_mode is StrayLightMode.CORRMM:
+            f |= SCodeFlags.STRAY_CORRMM
+        if self.sensitivity:
+            f |= SCodeFlags.SENS
+        if self.wavelength:
+            f |= SCodeFlags.WAVE
+        object.__setattr__(self, "flags", int(f))
 
-def get_scode_configs() -> Dict[str, SCodeConfig]:
+
+@lru_cache(maxsize=1)
+def get_scode_configs() -> Mapping[str, SCodeConfig]:
     """
     Aligned with the s_codes provided by user.
+    The table is static, so it is built once and shared by all callers
+    as a read-only mapping.
     """
-    return {
+    return MappingProxyType({
         "cs00": SCodeConfig(
             code="cs00",
             description="Dark correction only",
-            dark=True, dark_unc_source="MEAS",
+            dark=True, dark_unc_source=DarkUncSource.MEAS,
             nonlinearity=False, latency=False, prnu=False, count_rate=False,
-            temperature=False, straylight_mode="NO", sensitivity=False, wavelength=False,
+            temperature=False, straylight_mode=StrayLightMode.NO, sensitivity=False, wavelength=False,
             qcode="nlim", created="1-Dec-2016", author="Alexander Cede"
         ),
         "cs01": SCodeConfig(
             code="cs01",
             description="Dark, linearity, latency, PRNU and conversion to count rates",
-            dark=True, dark_unc_source="MEAS",
+            dark=True, dark_unc_source=DarkUncSource.MEAS,
             nonlinearity=True, latency=True, prnu=True, count_rate=True,
-            temperature=False, straylight_mode="NO", sensitivity=False, wavelength=False,
+            temperature=False, straylight_mode=StrayLightMode.NO, sensitivity=False, wavelength=False,
             qcode="nlim", created="1-Dec-2016", author="Alexander Cede"
         ),
         "cs02": SCodeConfig(
             code="cs02",
             description="Dark, linearity, latency, PRNU, count rates, temperature correction",
-            dark=True, dark_unc_source="MEAS",
+            dark=True, dark_unc_source=DarkUncSource.MEAS,
             nonlinearity=True, latency=True, prnu=True, count_rate=True,
-            temperature=True, straylight_mode="NO", sensitivity=False, wavelength=False,
+            temperature=True, straylight_mode=StrayLightMode.NO, sensitivity=False, wavelength=False,
             qcode="nlim", created="22-Feb-2017", author="Alexander Cede"
         ),
         "cs03": SCodeConfig(
             code="cs03",
             description="cs02 + MM stray light correction",
-            dark=True, dark_unc_source="MEAS",
+            dark=True, dark_unc_source=DarkUncSource.MEAS,
             nonlinearity=True, latency=True, prnu=True, count_rate=True,
-            temperature=True, straylight_mode="MM", sensitivity=False, wavelength=False,
+            temperature=True, straylight_mode=StrayLightMode.MM, sensitivity=False, wavelength=False,
             qcode="nlim", created="19-Jul-2017", author="Alexander Cede"
         ),
         "cs04": SCodeConfig(
             code="cs04",
             description="cs03 + sensitivity correction",
-            dark=True, dark_unc_source="MEAS",
+            dark=True, dark_unc_source=DarkUncSource.MEAS,
             nonlinearity=True, latency=True, prnu=True, count_rate=True,
-            temperature=True, straylight_mode="MM", sensitivity=True, wavelength=False,
+            temperature=True, straylight_mode=StrayLightMode.MM, sensitivity=True, wavelength=False,
             qcode="nlim", created="8-Nov-2017", author="Alexander Cede"
         ),
         "mca0": SCodeConfig(
             code="mca0",
             description="All corrections applied",
-            dark=True, dark_unc_source="MAPSIGMA",
+            dark=True, dark_unc_source=DarkUncSource.MAPSIGMA,
             nonlinearity=True, latency=True, prnu=True, count_rate=True,
-            temperature=True, straylight_mode="CORRMM", sensitivity=True, wavelength=True,
+            temperature=True, straylight_mode=StrayLightMode.CORRMM, sensitivity=True, wavelength=True,
             qcode="st00", created="20-Jan-2017", author="Alexander Cede"
         ),
         "mca1": SCodeConfig(
             code="mca1",
             description="All corrections except wavelength correction",
-            dark=True, dark_unc_source="MAPSIGMA",
+            dark=True, dark_unc_source=DarkUncSource.MAPSIGMA,
             nonlinearity=True, latency=True, prnu=True, count_rate=True,
-            temperature=True, straylight_mode="CORRMM", sensitivity=True, wavelength=False,
+            temperature=True, straylight_mode=StrayLightMode.CORRMM, sensitivity=True, wavelength=False,
             qcode="st00", created="20-Jan-2017", author="Alexander Cede"
         ),
-    }
+    })
+
+
+# The key set is fixed at import time and tiny, so a linear scan over a
+# tuple resolves in a couple of comparisons — cheaper than dict
+# hash+probe when a config is looked up per file or per record.
+_KEYS = tuple(get_scode_configs().keys())
+_VALUES = tuple(get_scode_configs().values())
+
+
+def get_scode(code: str) -> SCodeConfig:
+    """Resolve a single s-code by name. Raises KeyError if unknown."""
+    try:
+        return _VALUES[_KEYS.index(code)]
+    except ValueError:
+        raise KeyError(code) from None
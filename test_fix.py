@@ -1,35 +1,42 @@
 #!/usr/bin/env python3
-from io_utils import read_l0_csv
+from io_utils import read_l0_csv_batches
 from corrections import CalibrationData
-from processor import process_l0_to_l1
+from processor import ProcessStats, process_l0_to_l1
 from scodes import get_scode_configs
 
-# Load L0 data
+# Load L0 data in streaming batches so memory stays O(batch)
 l0_path = "/Users/ashu/Desktop/Github/L0-to-L1/Pandora209s1_Izana_20250911_L0.txt"
 print("[INFO] Reading L0 file...")
-l0 = read_l0_csv(l0_path)
-print(f"[INFO] Read {len(l0)} L0 records")
+l0_batches = read_l0_csv_batches(l0_path, 1024)
 
-if len(l0) > 0:
-    first_spec = l0[0].spectrum_counts
-    print(f"[INFO] First spectrum has {len(first_spec)} pixels")
-    
-    # Create calibration data
-    n_pix = len(first_spec)
-    cal = CalibrationData(n_pixels=n_pix)
-    print(f"[INFO] CalibrationData created with {n_pix} pixels")
-    print(f"[INFO] PRNU array has {len(cal.prnu)} pixels")
-    
-    # Try processing
-    print("[INFO] Processing L0 to L1...")
-    scode = get_scode_configs()[0]  # Use first s-code
-    try:
-        l1_records, stats = process_l0_to_l1(l0, scode, cal)
-        print(f"[SUCCESS] Processed {len(l1_records)} L1 records")
+scode = get_scode_configs()["cs00"]
+cals = {}  # one CalibrationData per pixel count (mixed-resolution files)
+stats = ProcessStats()
+n_l0 = 0
+n_l1 = 0
+
+try:
+    for l0 in l0_batches:
+        n_l0 += len(l0)
+        if len(l0) == 0:
+            continue
+        cal = cals.get(l0.n_pixels)
+        if cal is None:
+            n_pix = l0.n_pixels
+            print(f"[INFO] Found spectra with {n_pix} pixels")
+            cal = cals[n_pix] = CalibrationData(n_pixels=n_pix)
+            print(f"[INFO] CalibrationData created with {n_pix} pixels")
+            print(f"[INFO] PRNU array has {len(cal.prnu)} pixels")
+        l1, batch_stats = process_l0_to_l1(l0, scode, cal)
+        stats.merge(batch_stats)
+        n_l1 += len(l1)
+    print(f"[INFO] Read {n_l0} L0 records")
+    if n_l1 > 0:
+        print(f"[SUCCESS] Processed {n_l1} L1 records")
         print(f"[SUCCESS] Stats: {stats}")
-    except Exception as e:
-        print(f"[ERROR] {e}")
-        import traceback
-        traceback.print_exc()
-else:
-    print("[ERROR] No L0 records found!")
+    else:
+        print("[ERROR] No L0 records found!")
+except Exception as e:
+    print(f"[ERROR] {e}")
+    import traceback
+    traceback.print_exc()